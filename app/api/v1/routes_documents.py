@@ -1,7 +1,9 @@
 # app/api/v1/routes_documents.py
-from fastapi import APIRouter, UploadFile, File
-import os, shutil
-from ...workers.tasks import ingest_paths
+from fastapi import APIRouter, UploadFile, File, HTTPException
+from pydantic import BaseModel
+from typing import Optional
+import os, shutil, uuid
+from ...workers.tasks import ingest_paths, get_store
 from ...core.config import get_settings
 
 router = APIRouter(prefix="/documents", tags=["documents"])
@@ -18,3 +20,23 @@ async def upload(files: list[UploadFile] = File(...)):
         saved.append(path)
     stats = ingest_paths(saved)
     return {"saved": saved, **stats}
+
+class ExportPayload(BaseModel):
+    # earlier exports (under DATA_DIR): only blocks of other docs are exported
+    exclude: list[str] = []
+
+# Used by the offline rebuild (python -m app.workers.rebuild): this process holds
+# the DuckDB lock, so it is the one that can take a consistent snapshot.
+@router.post("/export")
+def export_blocks(body: Optional[ExportPayload] = None):
+    exclude = body.exclude if body else []
+    data_dir = os.path.realpath(settings.DATA_DIR)
+    for p in exclude:
+        if not os.path.realpath(p).startswith(data_dir + os.sep):
+            raise HTTPException(status_code=400, detail=f"exclude must be under DATA_DIR: {p}")
+
+    export_dir = os.path.join(settings.DATA_DIR, "exports")
+    os.makedirs(export_dir, exist_ok=True)
+    path = os.path.abspath(os.path.join(export_dir, f"blocks-{uuid.uuid4().hex}.parquet"))
+    rows = get_store().export_blocks(path, exclude=exclude)
+    return {"path": path, "rows": rows}
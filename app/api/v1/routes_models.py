@@ -1,8 +1,9 @@
 # app/api/v1/routes_models.py
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from app.pipeline.ner import extract_ents  
 from app.pipeline import classifier
+from app.workers.tasks import get_store
 
 router = APIRouter(prefix="/models", tags=["models"])
 
@@ -13,6 +14,19 @@ class TrainPayload(BaseModel):
 class PredictPayload(BaseModel):
     texts: list[str]
 
+class LabelItem(BaseModel):
+    doc_id: str
+    block_idx: int
+    label: str
+
+class LabelsPayload(BaseModel):
+    items: list[LabelItem]
+
+class TrainStreamPayload(BaseModel):
+    batch_size: int = Field(10000, gt=0)
+    incremental: bool = False
+    n_epochs: int = Field(1, ge=1)
+
 @router.post("/ner")
 async def run_ner(payload: dict):
     text = payload.get("text", "")
@@ -26,6 +40,24 @@ async def classifier_train(body: TrainPayload):
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/classifier/labels")
+async def classifier_labels(body: LabelsPayload):
+    try:
+        n = get_store().insert_labels([i.model_dump() for i in body.items])
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail={"unknown_blocks": e.args[0]})
+    return {"inserted": n}
+
+# Sync handler: runs in the threadpool, so predict keeps serving while it trains.
+@router.post("/classifier/train_stream")
+def classifier_train_stream(body: TrainStreamPayload):
+    try:
+        return classifier.train_stream(
+            get_store(), batch_size=body.batch_size, incremental=body.incremental, n_epochs=body.n_epochs
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.post("/classifier/predict")
 async def classifier_predict(body: PredictPayload):
     try:
@@ -12,6 +12,11 @@ class Settings(BaseSettings):
     DB_PATH: str = "./data/meta.duckdb"
     EMBEDDING_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
     ENABLE_RQ: bool = False
+    # Which routers this replica serves: all | search | ingest | models
+    APP_PROFILE: str = "all"
+    # Preload model/index in the background at startup; /ready is 503 until done.
+    # false = fast startup, everything loads on first request.
+    WARMUP_ON_STARTUP: bool = True
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
@@ -1,20 +1,47 @@
 
+import importlib, threading
+from contextlib import asynccontextmanager
+from typing import Optional
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from .core.logging_conf import configure_logging
-from .core.config import get_settings
-from .api.v1.routes_documents import router as docs_router
-from .api.v1.routes_search import router as search_router
-from .api.v1.routes_models import router as models_router
+from .core.config import Settings, get_settings
+from .workers.warmup import PROFILES, reset_status, status_snapshot, timed, update_status, warmup
 
 settings = get_settings()
 configure_logging(settings.LOG_LEVEL)
 
-app = FastAPI(title=settings.APP_NAME)
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    settings = settings or get_settings()
+    if settings.APP_PROFILE not in PROFILES:
+        raise ValueError(f"Unknown APP_PROFILE={settings.APP_PROFILE}, expected one of {list(PROFILES)}")
+    reset_status(settings.APP_PROFILE)
 
-@app.get("/health")
-def health():
-    return {"status": "ok", "env": settings.ENV}
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # Background thread: the server accepts /health right away, /ready waits for warmup.
+        if settings.WARMUP_ON_STARTUP:
+            threading.Thread(target=warmup, args=(settings.APP_PROFILE,), daemon=True).start()
+        else:
+            update_status(ready=True)
+        yield
 
-app.include_router(docs_router)
-app.include_router(search_router)
-app.include_router(models_router)
\ No newline at end of file
+    app = FastAPI(title=settings.APP_NAME, lifespan=lifespan)
+
+    @app.get("/health")
+    def health():
+        return {"status": "ok", "env": settings.ENV}
+
+    @app.get("/ready")
+    def ready():
+        status = status_snapshot()
+        return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+    # Only the routers of this profile are imported
+    for name in PROFILES[settings.APP_PROFILE]:
+        with timed(f"import:{name}"):
+            module = importlib.import_module(f".api.v1.routes_{name}", __package__)
+        app.include_router(module.router)
+    return app
+
+app = create_app(settings)
@@ -1,21 +1,159 @@
 # app/pipeline/classifier.py
-from typing import List, Dict, Any
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.svm import LinearSVC
-from sklearn.pipeline import Pipeline
-from sklearn.calibration import CalibratedClassifierCV
-from joblib import dump, load
-import os, time
+from typing import List, Dict, Any, Optional, TYPE_CHECKING
+import copy, os, random, re, time, uuid
+from contextlib import contextmanager
+
+# sklearn/joblib are imported inside the functions: importing this module stays cheap.
+if TYPE_CHECKING:
+    from sklearn.feature_extraction.text import HashingVectorizer
+    from sklearn.linear_model import SGDClassifier
+    from sklearn.pipeline import Pipeline
 
 MODEL_DIR = "data/models"
-MODEL_PATH = os.path.join(MODEL_DIR, "classifier.joblib")
+MODEL_PATH = os.path.join(MODEL_DIR, "classifier.joblib")  # legacy, unversioned
+LATEST_FILE = "LATEST"  # pointer to the active versioned artifact
+KEEP_VERSIONS = 5  # older artifacts are deleted after each save
+LOCK_STALE_SECONDS = 60  # a lockfile older than this was left by a dead process
+
+_loaded: Optional[tuple] = None  # (artifact name, payload) currently served
 
-def build_pipeline() -> Pipeline:
+def build_pipeline() -> "Pipeline":
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.svm import LinearSVC
+    from sklearn.pipeline import Pipeline
     return Pipeline([
         ("tfidf", TfidfVectorizer(max_features=25000, ngram_range=(1, 2))),
         ("clf", LinearSVC())
     ])
 
+def build_hashing_vectorizer() -> "HashingVectorizer":
+    from sklearn.feature_extraction.text import HashingVectorizer
+    # Stateless: no vocabulary to fit, so every chunk is transformed the same way.
+    return HashingVectorizer(n_features=2 ** 20, ngram_range=(1, 2), alternate_sign=False)
+
+def build_incremental_clf() -> "SGDClassifier":
+    from sklearn.linear_model import SGDClassifier
+    # log_loss gives predict_proba, so no separate calibration pass is needed.
+    return SGDClassifier(loss="log_loss", alpha=1e-5)
+
+# -------------------------
+# Versioned artifacts
+# -------------------------
+def _latest_path() -> str:
+    return os.path.join(MODEL_DIR, LATEST_FILE)
+
+def current_version() -> Optional[str]:
+    """
+    Name of the active artifact (e.g. classifier-v3.joblib), None if no versioned model.
+    """
+    try:
+        with open(_latest_path(), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def _versions() -> List[int]:
+    versions = []
+    if os.path.isdir(MODEL_DIR):
+        for name in os.listdir(MODEL_DIR):
+            m = re.fullmatch(r"classifier-v(\d+)\.joblib", name)
+            if m:
+                versions.append(int(m.group(1)))
+    return sorted(versions)
+
+def _reserve_version() -> int:
+    """
+    Creates the (empty) artifact file with O_EXCL, so two trainings, even in
+    different processes, never get the same version.
+    """
+    while True:
+        version = max(_versions(), default=0) + 1
+        path = os.path.join(MODEL_DIR, f"classifier-v{version}.joblib")
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return version
+        except FileExistsError:
+            continue
+
+def _prune_versions(active: str) -> None:
+    # Keeps the last KEEP_VERSIONS artifacts, and always the active one.
+    for v in _versions()[:-KEEP_VERSIONS]:
+        name = f"classifier-v{v}.joblib"
+        if name != active:
+            try:
+                os.remove(os.path.join(MODEL_DIR, name))
+            except FileNotFoundError:
+                pass
+
+@contextmanager
+def _latest_lock():
+    """
+    Cross-process lock (O_EXCL lockfile in MODEL_DIR) around reading and moving LATEST.
+    """
+    lock = _latest_path() + ".lock"
+    while True:
+        try:
+            os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock) > LOCK_STALE_SECONDS:
+                    os.remove(lock)
+                    continue
+            except FileNotFoundError:
+                continue
+            time.sleep(0.05)
+    try:
+        yield
+    finally:
+        os.remove(lock)
+
+def save_version(payload: Dict[str, Any]) -> str:
+    """
+    Writes a new versioned artifact and then points LATEST to it.
+    Both writes go through a temp file + os.replace, so predict never reads half a file.
+    """
+    from joblib import dump
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    version = _reserve_version()
+    name = f"classifier-v{version}.joblib"
+    payload["version"] = version
+
+    path = os.path.join(MODEL_DIR, name)
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    dump(payload, tmp)
+    os.replace(tmp, path)
+
+    with _latest_lock():
+        # LATEST never moves back to an older version, even with concurrent trainings
+        active = current_version()
+        m = re.fullmatch(r"classifier-v(\d+)\.joblib", active or "")
+        if m is None or int(m.group(1)) < version:
+            tmp = f"{_latest_path()}.{uuid.uuid4().hex}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(name)
+            os.replace(tmp, _latest_path())
+            active = name
+        _prune_versions(active)
+    return path
+
+def load_current() -> Dict[str, Any]:
+    """
+    Returns the active model. Reloads only when LATEST changed (hot swap).
+    Falls back to the legacy MODEL_PATH. FileNotFoundError if there is no model.
+    """
+    global _loaded
+    name = current_version()
+    path = os.path.join(MODEL_DIR, name) if name else os.path.join(MODEL_DIR, "classifier.joblib")
+    key = name or path
+    if _loaded is None or _loaded[0] != key:
+        from joblib import load
+        _loaded = (key, load(path))  # FileNotFoundError if not exists
+    return _loaded[1]
+
+# -------------------------
+# Training
+# -------------------------
 def train(texts: List[str], labels: List[str]) -> Dict[str, Any]:
     """
     Trains with a baseline (TF-IDF + LinearSVC) and loads:
@@ -27,36 +165,116 @@ def train(texts: List[str], labels: List[str]) -> Dict[str, Any]:
     if len(texts) != len(labels) or len(texts) < 2:
         raise ValueError("texts y labels deben tener mismo tamaño y >=2 ejemplos")
 
-    os.makedirs(MODEL_DIR, exist_ok=True)
+    from sklearn.calibration import CalibratedClassifierCV
     pipe = build_pipeline()
-    pipe.fit(texts, labels)
-
-    # Calibration for tests.
-    X = pipe.named_steps["tfidf"].transform(texts)
+    tfidf = pipe.named_steps["tfidf"]
     base_clf = pipe.named_steps["clf"]
+
+    # TF-IDF is computed once and reused for the calibration.
+    X = tfidf.fit_transform(texts)
+    base_clf.fit(X, labels)
     calibrated = CalibratedClassifierCV(base_clf, cv="prefit")
     calibrated.fit(X, labels)
 
     payload = {
-        "tfidf": pipe.named_steps["tfidf"],
+        "tfidf": tfidf,
         "clf": base_clf,
         "calibrated": calibrated,
         "labels": sorted(list(set(labels))),
         "trained_at": int(time.time()),
     }
-    dump(payload, MODEL_PATH)
-    return {"ok": True, "path": MODEL_PATH, "labels": payload["labels"]}
+    path = save_version(payload)
+    return {"ok": True, "path": path, "version": payload["version"], "labels": payload["labels"]}
+
+def train_stream(
+    store, batch_size: int = 10000, incremental: bool = False,
+    n_epochs: int = 1, seed: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Out-of-core training from the DuckDB block_labels table:
+    - HashingVectorizer (stateless) + SGDClassifier.partial_fit per chunk
+    - rows come in a different pseudo-random order each epoch and are shuffled
+      inside each chunk (labels are usually added in same-class bursts)
+    - incremental=True continues the active streamed model with only the
+      rows labelled after it was trained
+    Saves a new version; predict picks it up without restart.
+    """
+    import numpy as np
+
+    if n_epochs < 1:
+        raise ValueError("n_epochs debe ser >=1")
+    seed = random.randrange(2 ** 31) if seed is None else seed
+    rng = np.random.default_rng(seed)
+
+    classes = store.fetch_label_classes()
+
+    if incremental:
+        try:
+            base = load_current()
+        except FileNotFoundError:
+            base = None
+        if base is None or "vectorizer" not in base:
+            raise ValueError("No hay modelo incremental; entrena primero con incremental=false")
+        new = sorted(set(classes) - set(base["labels"]))
+        if new:
+            raise ValueError(f"Etiquetas nuevas {new}; reentrena con incremental=false")
+        # Copy so the model being served is not mutated while training.
+        vectorizer, clf = base["vectorizer"], copy.deepcopy(base["clf"])
+        clf.densify()  # saved sparse; partial_fit needs dense coef_
+        classes, after, n_seen = base["labels"], base["last_label_id"], base["n_samples"]
+    else:
+        if len(classes) < 2:
+            raise ValueError("Se necesitan >=2 etiquetas distintas en block_labels")
+        vectorizer, clf = build_hashing_vectorizer(), build_incremental_clf()
+        after, n_seen = 0, 0
+
+    n_new, watermark = 0, after
+    for epoch in range(n_epochs):
+        chunks = store.iter_labelled_blocks(batch_size, after_label_id=after, seed=seed + epoch)
+        for texts, labels, max_id in chunks:
+            perm = rng.permutation(len(texts))
+            X = vectorizer.transform([texts[i] for i in perm])
+            clf.partial_fit(X, [labels[i] for i in perm], classes=classes)
+            if epoch == 0:
+                n_new += len(texts)
+                watermark = max(watermark, max_id)
+        if n_new == 0:
+            raise ValueError("No hay ejemplos etiquetados nuevos")
+
+    # Hashed features never seen are 0: sparse coef_ keeps the artifact small.
+    clf.sparsify()
+
+    payload = {
+        "vectorizer": vectorizer,
+        "clf": clf,
+        "labels": list(classes),
+        "last_label_id": watermark,
+        "n_samples": n_seen + n_new,
+        "trained_at": int(time.time()),
+    }
+    path = save_version(payload)
+    return {
+        "ok": True,
+        "path": path,
+        "version": payload["version"],
+        "labels": payload["labels"],
+        "samples_seen": n_new,
+        "epochs": n_epochs,
+        "total_samples": payload["n_samples"],
+    }
 
 def predict(texts: List[str]) -> List[Dict[str, Any]]:
     """
     Loads model and predicts labels + scores
     """
-    payload = load(MODEL_PATH)  # FileNotFoundError if not exists
-    tfidf = payload["tfidf"]
+    payload = load_current()
+    vectorizer = payload["vectorizer"] if "vectorizer" in payload else payload["tfidf"]
     clf = payload["clf"]
     calibrated = payload.get("calibrated", None)
+    if calibrated is None and hasattr(clf, "predict_proba"):
+        calibrated = clf
 
-    X = tfidf.transform(texts)
+    X = vectorizer.transform(texts)
     y = clf.predict(X).tolist()
 
     scores: List[Dict[str, float]]
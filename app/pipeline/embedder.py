@@ -1,18 +1,38 @@
 # app/pipeline/embedder.py
 # Changes text into normalized vectors.
-from typing import List
+from typing import Dict, List, TYPE_CHECKING
 import numpy as np
-from sentence_transformers import SentenceTransformer
 
-_model = None  # cache single-model
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
 
-def get_model(name: str) -> SentenceTransformer:
-    global _model
-    if _model is None:
-        _model = SentenceTransformer(name)
-    return _model
+_models: Dict[str, "SentenceTransformer"] = {}  # cache per model name (an index swap may change it)
+
+def get_model(name: str) -> "SentenceTransformer":
+    if name not in _models:
+        # Imported on first use: torch + sentence-transformers are the slowest part of startup.
+        from sentence_transformers import SentenceTransformer
+        _models[name] = SentenceTransformer(name)
+    return _models[name]
+
+def embedding_dim(name: str) -> int:
+    return get_model(name).get_sentence_embedding_dimension()
 
 def embed_texts(texts: List[str], model_name: str) -> np.ndarray:
     m = get_model(model_name)
     vecs = m.encode(texts, show_progress_bar=False, normalize_embeddings=True)
     return np.asarray(vecs, dtype="float32")
+
+# Multi-process encoding (offline rebuilds). One worker process per device.
+def start_pool(model_name: str, workers: int):
+    m = get_model(model_name)
+    return m.start_multi_process_pool(target_devices=["cpu"] * workers)
+
+def stop_pool(pool) -> None:
+    from sentence_transformers import SentenceTransformer
+    SentenceTransformer.stop_multi_process_pool(pool)
+
+def embed_texts_pool(texts: List[str], model_name: str, pool, batch_size: int = 64) -> np.ndarray:
+    m = get_model(model_name)
+    vecs = m.encode_multi_process(texts, pool, batch_size=batch_size, normalize_embeddings=True)
+    return np.asarray(vecs, dtype="float32")
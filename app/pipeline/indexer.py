@@ -2,20 +2,52 @@
 # FAISS Index in a disk + metadata per vector.
 # Using IndexFlatIP for cosine
 
-import os, pickle
-from typing import List, Dict
+import os, json, pickle
+from typing import List, Dict, Optional
 import numpy as np
-import faiss
+
+BUILD_FILE = "BUILD"  # written by the offline rebuild; changes on every swap
+
+def read_build(index_dir: str) -> Optional[Dict]:
+    """
+    Build info of the index on disk ({"build_id", "model", "dim", "rows"}), None if missing.
+    """
+    try:
+        with open(os.path.join(index_dir, BUILD_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+def build_key(index_dir: str) -> Optional[tuple]:
+    """
+    Cheap change detector for BUILD (one stat, follows the INDEX_DIR symlink).
+    """
+    try:
+        st = os.stat(os.path.join(index_dir, BUILD_FILE))
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns)
+
+class StaleIndexError(RuntimeError):
+    """
+    The index was swapped out by an offline rebuild after this object was loaded.
+    """
 
 class FaissIndex:
     def __init__(self, dim: int, index_dir: str):
         self.dim = dim
-        self.index_dir = index_dir
         os.makedirs(index_dir, exist_ok=True)
+        # The configured path (maybe a symlink) and the directory it resolved to at load time
+        self.root_dir = os.path.abspath(index_dir)
+        self.index_dir = os.path.realpath(index_dir)
+        self.build = read_build(self.index_dir)
+        index_dir = self.index_dir
 
         self.index_path = os.path.join(index_dir, "index.faiss")
         self.meta_path = os.path.join(index_dir, "meta.pkl")
 
+        import faiss  # lazy: only processes that use the index pay for it
+
         # Producto interno (IP). Con embeddings normalizados ≈ coseno.
         self.index = faiss.IndexFlatIP(dim)
         self.meta: List[Dict] = []
@@ -23,12 +55,22 @@ class FaissIndex:
         if os.path.exists(self.index_path) and os.path.exists(self.meta_path):
             self.load()
 
-    def add(self, vecs: np.ndarray, metas: List[Dict]) -> None:
+    def is_stale(self) -> bool:
+        """
+        True once a swap moved root_dir to another build (or replaced its BUILD).
+        Writing then would overwrite a newer index, possibly from another model.
+        """
+        return os.path.realpath(self.root_dir) != self.index_dir or read_build(self.index_dir) != self.build
+
+    def add(self, vecs: np.ndarray, metas: List[Dict], persist: bool = True) -> None:
         assert vecs.dtype == np.float32, "Embeddings deben ser float32"
         assert vecs.shape[1] == self.dim, f"Se esperaba dim={self.dim}, got {vecs.shape[1]}"
+        if persist and self.is_stale():
+            raise StaleIndexError(self.root_dir)
         self.index.add(vecs)
         self.meta.extend(metas)
-        self.save()
+        if persist:
+            self.save()
 
     def search(self, query_vecs: np.ndarray, k: int = 5) -> List[List[Dict]]:
         D, I = self.index.search(query_vecs.astype("float32"), k)
@@ -45,11 +87,16 @@ class FaissIndex:
         return results
 
     def save(self) -> None:
+        import faiss
+        if self.is_stale():
+            raise StaleIndexError(self.root_dir)
         faiss.write_index(self.index, self.index_path)
         with open(self.meta_path, "wb") as f:
             pickle.dump(self.meta, f)
 
     def load(self) -> None:
+        import faiss
         self.index = faiss.read_index(self.index_path)
+        self.dim = self.index.d  # the index on disk wins (it may come from another model)
         with open(self.meta_path, "rb") as f:
             self.meta = pickle.load(f)
@@ -3,13 +3,12 @@
 # NER = Named Entity Recognition
 # Identifies entities and assignes labels
 
-import spacy
-
 _nlp = None
 
 def get_nlp(model: str = "en_core_web_sm"):
     global _nlp
     if _nlp is None:
+        import spacy  # lazy: only the models profile needs it
         _nlp = spacy.load(model)
     return _nlp
 
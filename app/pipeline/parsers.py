@@ -8,9 +8,8 @@ import os, uuid, json, mimetypes
 from typing import List
 from .document_models import ParsedDocument, Block
 
-# Parsing dependencies
-import pdfplumber
-from docx import Document as Docx
+# Parsing dependencies (pdfplumber, python-docx) are imported inside parse(),
+# only for the type being read.
 
 # Supported extensions
 EXT_TO_MIME = {
@@ -32,6 +31,7 @@ def parse(path: str) -> ParsedDocument:
     mime = sniff_mime(path)
     doc_id = str(uuid.uuid4())  
     if mime == EXT_TO_MIME[".pdf"]:
+        import pdfplumber
         blocks: List[Block] = []
         with pdfplumber.open(path) as pdf:
             for i, page in enumerate(pdf.pages):
@@ -40,6 +40,7 @@ def parse(path: str) -> ParsedDocument:
         return ParsedDocument(doc_id, path, mime, title=None, blocks=blocks)
 
     if mime == EXT_TO_MIME[".docx"]:
+        from docx import Document as Docx
         d = Docx(path)
         blocks: List[Block] = []
         for p in d.paragraphs:
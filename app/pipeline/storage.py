@@ -9,7 +9,7 @@ Ofeers simple functions for storing and updated documents and blocks
 
 import os
 import json
-from typing import Dict, List, Tuple, Any
+from typing import Dict, Iterator, List, Optional, Tuple, Any
 import duckdb
 
 
@@ -18,17 +18,20 @@ class MetaStore:
     Layer of persistenfe for:
     - documents: metadata
     - blocks: pieces of indexable texts
+    - block_labels: labels per block (for classifier training)
     - ab_metrics: logs of A/B embeddings
     """
 
-    def __init__(self, path: str):
+    def __init__(self, path: str, read_only: bool = False):
         # Secures the archive's foderl .dickdb
         dirpath = os.path.dirname(path)
         if dirpath:
             os.makedirs(dirpath, exist_ok=True)
 
-        self.con = duckdb.connect(path)
-        self._init_schema()
+        # read_only: for offline tools; fails (duckdb.IOException) while another process holds the file
+        self.con = duckdb.connect(path, read_only=read_only)
+        if not read_only:
+            self._init_schema()
 
     def _init_schema(self) -> None:
         self.con.execute(
@@ -54,6 +57,20 @@ class MetaStore:
         # Useful for search per document and reingests
         self.con.execute("CREATE INDEX IF NOT EXISTS blocks_doc_idx ON blocks(doc_id);")
 
+        # Labels per block. label_id grows monotonically so incremental
+        # training can resume from the last row it has already seen.
+        self.con.execute("CREATE SEQUENCE IF NOT EXISTS block_labels_seq;")
+        self.con.execute(
+            """
+            CREATE TABLE IF NOT EXISTS block_labels(
+                label_id  BIGINT DEFAULT nextval('block_labels_seq'),
+                doc_id    TEXT,
+                block_idx INTEGER,
+                label     TEXT
+            );
+            """
+        )
+
         # A/B metrics for embeddings
         self.con.execute(
             """
@@ -102,6 +119,35 @@ class MetaStore:
             n += 1
         return n
 
+    def insert_labels(self, labels: List[Dict[str, Any]]) -> int:
+        """
+        Inserts labels for existing blocks. Wants keys: doc_id, block_idx, label.
+        Output: how many were inserted.
+        KeyError (and nothing inserted) if any of them points to a block that does not exist.
+        """
+        if not labels:
+            return 0
+        rows = [(l["doc_id"], l["block_idx"], l["label"]) for l in labels]
+        values = ", ".join(["(?, ?)"] * len(rows))
+        params = [v for r in rows for v in r[:2]]
+        missing = self.con.execute(
+            f"""
+            SELECT v.doc_id, v.block_idx
+            FROM (VALUES {values}) v(doc_id, block_idx)
+            LEFT JOIN blocks b ON b.doc_id = v.doc_id AND b.block_idx = v.block_idx
+            WHERE b.doc_id IS NULL
+            """,
+            params,
+        ).fetchall()
+        if missing:
+            raise KeyError([{"doc_id": m[0], "block_idx": m[1]} for m in missing])
+
+        self.con.executemany(
+            "INSERT INTO block_labels (doc_id, block_idx, label) VALUES (?, ?, ?)",
+            rows,
+        )
+        return len(rows)
+
     # -------------------------
     # Readings of the pipeline
     # -------------------------
@@ -136,6 +182,86 @@ class MetaStore:
         metas = [{"doc_id": doc_id, "block_idx": r[0], "text": r[1]} for r in rows]
         return texts, metas
 
+    def export_blocks(self, dest: str, exclude: Optional[List[str]] = None) -> int:
+        """
+        Consistent snapshot of the blocks (doc_id, block_idx, text) into a Parquet
+        file, in a stable order (doc_id, block_idx). Used by the offline rebuild.
+        exclude: earlier exports; their doc_ids are left out (blocks added since then).
+        Output: rows in the written file.
+        """
+        def lit(s: str) -> str:
+            return "'" + s.replace("'", "''") + "'"
+
+        tmp = dest + ".tmp"
+        where = ""
+        if exclude:
+            files = ", ".join(lit(p) for p in exclude)
+            where = f"WHERE doc_id NOT IN (SELECT doc_id FROM read_parquet([{files}]))"
+        cur = self.con.cursor()
+        try:
+            cur.execute(
+                f"COPY (SELECT doc_id, block_idx, text FROM blocks {where} ORDER BY doc_id, block_idx) "
+                f"TO {lit(tmp)} (FORMAT PARQUET)"
+            )
+            rows = cur.execute("SELECT COUNT(*) FROM read_parquet(?)", (tmp,)).fetchone()[0]
+        finally:
+            cur.close()
+        os.replace(tmp, dest)
+        return rows
+
+    def fetch_label_classes(self) -> List[str]:
+        """
+        Distinct labels of existing blocks, sorted (the classifier needs them
+        before the first batch). Same join as iter_labelled_blocks.
+        Own cursor: called from training threads.
+        """
+        cur = self.con.cursor()
+        try:
+            return [
+                r[0] for r in cur.execute(
+                    """
+                    SELECT DISTINCT l.label
+                    FROM block_labels l
+                    JOIN blocks b ON b.doc_id = l.doc_id AND b.block_idx = l.block_idx
+                    ORDER BY l.label
+                    """
+                ).fetchall()
+            ]
+        finally:
+            cur.close()
+
+    def iter_labelled_blocks(
+        self, batch_size: int = 10000, after_label_id: int = 0, seed: Optional[int] = None
+    ) -> Iterator[Tuple[List[str], List[str], int]]:
+        """
+        Streams (texts, labels, max_label_id) in chunks of batch_size.
+        Only rows with label_id > after_label_id.
+        seed=None keeps label_id order; otherwise rows come in a pseudo-random
+        order (hash of label_id + seed), so chunks are not sorted by class.
+        Never loads the whole table in memory.
+        """
+        order = "l.label_id" if seed is None else "hash(l.label_id + ?)"
+        params = [after_label_id] if seed is None else [after_label_id, seed]
+        cur = self.con.cursor()
+        cur.execute(
+            f"""
+            SELECT l.label_id, b.text, l.label
+            FROM block_labels l
+            JOIN blocks b ON b.doc_id = l.doc_id AND b.block_idx = l.block_idx
+            WHERE l.label_id > ?
+            ORDER BY {order}
+            """,
+            params,
+        )
+        try:
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield [r[1] for r in rows], [r[2] for r in rows], max(r[0] for r in rows)
+        finally:
+            cur.close()
+
     # -------------------------
     # A/B Metrics
     # -------------------------
@@ -0,0 +1,75 @@
+# tests/test_classifier.py
+import os
+import pytest
+from app.pipeline import classifier
+from app.pipeline.storage import MetaStore
+
+TEXTS = ["Lease contract terms", "Consulting invoice", "Termination clause", "Payment receipt"]
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(classifier, "MODEL_DIR", str(tmp_path / "models"))
+    monkeypatch.setattr(classifier, "_loaded", None)
+    s = MetaStore(str(tmp_path / "meta.duckdb"))
+    s.insert_blocks("d1", [{"text": t, "meta": {}} for t in TEXTS])
+    return s
+
+def test_train_stream_incremental(store):
+    store.insert_labels([
+        {"doc_id": "d1", "block_idx": 0, "label": "legal"},
+        {"doc_id": "d1", "block_idx": 1, "label": "finance"},
+    ])
+
+    res = classifier.train_stream(store, batch_size=1, n_epochs=3, seed=0)
+    assert res["version"] == 1
+    assert res["labels"] == ["finance", "legal"]
+    assert res["samples_seen"] == 2
+
+    # New labelled rows arrive: only those are consumed, and predict hot-swaps.
+    store.insert_labels([
+        {"doc_id": "d1", "block_idx": 2, "label": "legal"},
+        {"doc_id": "d1", "block_idx": 3, "label": "finance"},
+    ])
+    res = classifier.train_stream(store, incremental=True)
+    assert res["version"] == 2
+    assert res["samples_seen"] == 2
+    assert res["total_samples"] == 4
+
+    preds = classifier.predict(["lease"])
+    assert classifier.current_version() == "classifier-v2.joblib"
+    assert set(preds[0]["scores"]) == {"finance", "legal"}
+
+def test_labels_for_unknown_blocks_are_rejected(store):
+    with pytest.raises(KeyError):
+        store.insert_labels([
+            {"doc_id": "d1", "block_idx": 0, "label": "legal"},
+            {"doc_id": "nope", "block_idx": 0, "label": "ghost"},
+        ])
+
+    # Nothing was inserted, and no phantom class appears.
+    assert store.fetch_label_classes() == []
+    assert list(store.iter_labelled_blocks()) == []
+
+def test_old_versions_are_pruned(store, monkeypatch):
+    monkeypatch.setattr(classifier, "KEEP_VERSIONS", 2)
+    store.insert_labels([
+        {"doc_id": "d1", "block_idx": 0, "label": "legal"},
+        {"doc_id": "d1", "block_idx": 1, "label": "finance"},
+    ])
+    for _ in range(4):
+        classifier.train_stream(store)
+
+    files = sorted(f for f in os.listdir(classifier.MODEL_DIR) if f.endswith(".joblib"))
+    assert files == ["classifier-v3.joblib", "classifier-v4.joblib"]
+    assert classifier.current_version() == "classifier-v4.joblib"
+    assert not os.path.exists(os.path.join(classifier.MODEL_DIR, "LATEST.lock"))
+
+def test_train_stream_payload_is_validated():
+    from pydantic import ValidationError
+    from app.api.v1.routes_models import TrainStreamPayload
+    with pytest.raises(ValidationError):
+        TrainStreamPayload(batch_size=0)
+    with pytest.raises(ValidationError):
+        TrainStreamPayload(batch_size=-1)
+    with pytest.raises(ValidationError):
+        TrainStreamPayload(n_epochs=0)
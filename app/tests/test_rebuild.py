@@ -0,0 +1,182 @@
+# tests/test_rebuild.py
+import os, time
+import numpy as np
+import pytest
+from app.pipeline.indexer import FaissIndex, StaleIndexError, read_build
+from app.pipeline.storage import MetaStore
+from app.workers import rebuild, tasks
+
+DIM = 4
+
+@pytest.fixture
+def fake_embed(monkeypatch):
+    calls = []
+    def embed(texts, model, pool):
+        calls.append(len(texts))
+        return np.ones((len(texts), DIM), dtype="float32")
+    monkeypatch.setattr(rebuild, "start_pool", lambda model, workers: object())
+    monkeypatch.setattr(rebuild, "stop_pool", lambda pool: None)
+    monkeypatch.setattr(rebuild, "embed_texts_pool", embed)
+    return calls
+
+@pytest.fixture
+def db(tmp_path):
+    path = str(tmp_path / "meta.duckdb")
+    store = MetaStore(path)
+    store.insert_blocks("d1", [{"text": f"t{i}", "meta": {}} for i in range(5)])
+    store.close()  # the rebuild opens it read-only
+    return path
+
+def _build(tmp_path, build_id, model):
+    index = FaissIndex(dim=DIM, index_dir=str(tmp_path / "index.builds" / build_id))
+    index.add(np.ones((1, DIM), dtype="float32"), [{"doc_id": build_id}])
+    with open(os.path.join(index.index_dir, "BUILD"), "w", encoding="utf-8") as f:
+        f.write(f'{{"build_id": "{build_id}", "model": "{model}", "dim": {DIM}, "rows": 1}}')
+    return index.index_dir
+
+def test_rebuild_resumes_from_shards(tmp_path, db, fake_embed):
+    work = str(tmp_path / "index.rebuild")
+    manifest = rebuild._prepare(work, db, "m", 2, fresh=False, api_url="")
+    assert manifest["rows"] == 5
+
+    assert rebuild.embed_shards(work, "m", 2, workers=1) == 5
+    assert fake_embed == [2, 2, 1]
+
+    # Killed run: one shard missing. Only that chunk is embedded again.
+    os.remove(os.path.join(work, "shard-00001.npy"))
+    assert rebuild._prepare(work, db, "m", 2, fresh=False, api_url="") == manifest
+    rebuild.embed_shards(work, "m", 2, workers=1)
+    assert fake_embed == [2, 2, 1, 2]
+
+    new_dir = rebuild.build_index(work, manifest, 5, str(tmp_path / "index.builds"))
+    assert FaissIndex(dim=DIM, index_dir=new_dir).index.ntotal == 5
+    assert read_build(new_dir)["build_id"] == manifest["build_id"]
+
+def test_catch_up_appends_blocks_ingested_after_snapshot(tmp_path, db, fake_embed, monkeypatch):
+    monkeypatch.setattr(rebuild, "embed_texts", lambda texts, model: np.ones((len(texts), DIM), dtype="float32"))
+    work = str(tmp_path / "index.rebuild")
+    manifest = rebuild._prepare(work, db, "m", 2, fresh=False, api_url="")
+    rows = rebuild.embed_shards(work, "m", 2, workers=1)
+    new_dir = rebuild.build_index(work, manifest, rows, str(tmp_path / "index.builds"))
+
+    # uploaded while the shards were embedded
+    store = MetaStore(db)
+    store.insert_blocks("d2", [{"text": "late", "meta": {}}, {"text": "later", "meta": {}}])
+    store.close()
+
+    assert rebuild.catch_up(work, new_dir, db, "", "m", 2) == 2
+    index = FaissIndex(dim=DIM, index_dir=new_dir)
+    assert index.index.ntotal == 7
+    assert {m["doc_id"] for m in index.meta} == {"d1", "d2"}
+    assert read_build(new_dir)["rows"] == 7
+
+def test_catch_up_refuses_to_swap_while_blocks_keep_arriving(tmp_path, db, fake_embed, monkeypatch):
+    monkeypatch.setattr(rebuild, "embed_texts", lambda texts, model: np.ones((len(texts), DIM), dtype="float32"))
+    work = str(tmp_path / "index.rebuild")
+    manifest = rebuild._prepare(work, db, "m", 2, fresh=False, api_url="")
+    rows = rebuild.embed_shards(work, "m", 2, workers=1)
+    new_dir = rebuild.build_index(work, manifest, rows, str(tmp_path / "index.builds"))
+
+    export = rebuild.export_snapshot
+    def ingest_and_export(dest, db_path, api_url, exclude=None):
+        # one more upload before every round
+        store = MetaStore(db_path)
+        store.insert_blocks(os.path.basename(dest), [{"text": "new", "meta": {}}])
+        store.close()
+        return export(dest, db_path, api_url, exclude=exclude)
+    monkeypatch.setattr(rebuild, "export_snapshot", ingest_and_export)
+    with pytest.raises(SystemExit):
+        rebuild.catch_up(work, new_dir, db, "", "m", 2)
+
+def test_swap_flips_symlink(tmp_path):
+    index_dir = str(tmp_path / "index")
+    os.makedirs(index_dir)  # plain dir from before the first rebuild
+
+    a = _build(tmp_path, "a", "m")
+    rebuild.swap(a, index_dir)
+    assert os.path.islink(index_dir)
+    assert read_build(index_dir)["build_id"] == "a"
+
+    b = _build(tmp_path, "b", "m")
+    rebuild.swap(b, index_dir)
+    assert read_build(index_dir)["build_id"] == "b"
+
+    c = _build(tmp_path, "c", "m")
+    rebuild.swap(c, index_dir)
+    # new + previous are kept, older builds are removed
+    assert sorted(os.listdir(tmp_path / "index.builds")) == ["b", "c"]
+
+@pytest.fixture
+def live_index(tmp_path, monkeypatch):
+    index_dir = str(tmp_path / "index")
+    loaded = []
+    monkeypatch.setattr(tasks.settings, "INDEX_DIR", index_dir)
+    monkeypatch.setattr(tasks.settings, "EMBEDDING_MODEL", "m1")
+    monkeypatch.setattr(tasks, "get_model", loaded.append)
+    monkeypatch.setattr(tasks, "_index", None)
+    monkeypatch.setattr(tasks, "_index_key", None)
+    monkeypatch.setattr(tasks, "_reloading", None)
+    monkeypatch.setattr(tasks, "_failed_key", None)
+    return index_dir, loaded
+
+def test_get_index_reloads_after_swap(tmp_path, live_index):
+    index_dir, loaded = live_index
+    rebuild.swap(_build(tmp_path, "a", "m1"), index_dir)
+    first = tasks.get_index()
+    assert tasks.get_index() is first
+    assert tasks.index_model(first) == "m1"
+
+    rebuild.swap(_build(tmp_path, "b", "m2"), index_dir)
+    # loaded in the background: the old index serves until the new one is ready
+    second = tasks.get_index()
+    deadline = time.time() + 5
+    while second is first and time.time() < deadline:
+        time.sleep(0.01)
+        second = tasks.get_index()
+    assert second is not first
+    assert loaded == ["m1", "m2"]  # the model is loaded before the index is served
+    assert second.build["build_id"] == "b"
+    # queries follow the model of the index, not EMBEDDING_MODEL
+    assert tasks.index_model(second) == "m2"
+
+def test_stale_index_is_not_saved(tmp_path):
+    index_dir = str(tmp_path / "index")
+    old = FaissIndex(dim=DIM, index_dir=index_dir)
+    old.add(np.ones((1, DIM), dtype="float32"), [{"doc_id": "old"}])
+
+    new_dir = _build(tmp_path, "a", "m")
+    rebuild.swap(new_dir, index_dir)
+    # the first swap moves the plain dir away: index_dir is now the new build
+    with pytest.raises(StaleIndexError):
+        old.add(np.ones((1, DIM), dtype="float32"), [{"doc_id": "late"}])
+    assert FaissIndex(dim=DIM, index_dir=index_dir).meta == [{"doc_id": "a"}]
+
+def test_ingest_spanning_first_swap(tmp_path, live_index, monkeypatch):
+    index_dir, _ = live_index
+    old = FaissIndex(dim=DIM, index_dir=index_dir)  # plain dir from before the first rebuild
+    old.add(np.ones((1, DIM), dtype="float32"), [{"doc_id": "old"}])
+    store = MetaStore(str(tmp_path / "meta.duckdb"))
+    monkeypatch.setattr(tasks, "get_store", lambda: store)
+
+    new_dir = _build(tmp_path, "a", "m2")
+    models = []
+    def embed(texts, model):
+        models.append(model)
+        if len(models) == 1:
+            rebuild.swap(new_dir, index_dir)  # the rebuild finishes while this upload embeds
+        return np.ones((len(texts), DIM), dtype="float32")
+    monkeypatch.setattr(tasks, "embed_texts", embed)
+
+    doc = tmp_path / "doc.json"
+    doc.write_text('{"a": 1}', encoding="utf-8")
+    assert tasks.get_index() is not None
+    assert tasks.ingest_paths([str(doc)])["blocks_indexed"] == 1
+
+    # re-embedded with the model of the new build and added to it
+    assert models == ["m1", "m2"]
+    index = FaissIndex(dim=DIM, index_dir=index_dir)
+    assert index.build["build_id"] == "a"
+    assert [m["doc_id"] for m in index.meta][0] == "a" and len(index.meta) == 2
+    legacy = [n for n in os.listdir(tmp_path / "index.builds") if n.startswith("legacy-")]
+    assert FaissIndex(dim=DIM, index_dir=str(tmp_path / "index.builds" / legacy[0])).meta == [{"doc_id": "old"}]
+    store.close()
@@ -0,0 +1,105 @@
+# tests/test_startup.py
+import importlib.util, os, subprocess, sys, threading, time
+import pytest
+from fastapi.testclient import TestClient
+from app import main
+from app.core.config import Settings
+from app.workers import warmup as warmup_mod
+
+HEAVY = ["torch", "sentence_transformers", "faiss", "spacy", "sklearn", "pdfplumber", "docx"]
+
+def _paths(app):
+    return set(app.openapi()["paths"])
+
+@pytest.mark.skipif(
+    any(importlib.util.find_spec(m) is None for m in HEAVY),
+    reason="needs the heavy dependencies installed to prove they are not imported",
+)
+def test_import_app_is_lazy(tmp_path):
+    # Fresh interpreter: other tests may already have imported the heavy modules.
+    code = (
+        "import sys, app.main; "
+        f"print([m for m in {HEAVY!r} if m in sys.modules])"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True, text=True, check=True,
+        env={**os.environ, "DB_PATH": str(tmp_path / "meta.duckdb")},
+    )
+    assert out.stdout.strip().splitlines()[-1] == "[]"
+
+def test_ready_is_503_until_warmup_done(monkeypatch):
+    done = threading.Event()
+    def fake_warmup(profile):
+        done.wait(5)
+        warmup_mod.update_status(ready=True)
+    monkeypatch.setattr(main, "warmup", fake_warmup)
+
+    app = main.create_app(Settings(APP_PROFILE="search", WARMUP_ON_STARTUP=True))
+    with TestClient(app) as client:
+        assert client.get("/health").status_code == 200
+        assert client.get("/ready").status_code == 503
+        done.set()
+        for _ in range(50):
+            res = client.get("/ready")
+            if res.status_code == 200:
+                break
+            time.sleep(0.05)
+        assert res.status_code == 200
+        assert res.json()["profile"] == "search"
+        assert "import:search" in res.json()["components"]
+
+def test_ready_without_warmup():
+    app = main.create_app(Settings(APP_PROFILE="search", WARMUP_ON_STARTUP=False))
+    with TestClient(app) as client:
+        assert client.get("/ready").status_code == 200
+
+def test_profiles_mount_only_their_routers():
+    paths = _paths(main.create_app(Settings(APP_PROFILE="search", WARMUP_ON_STARTUP=False)))
+    assert "/search" in paths
+    assert not any(p.startswith(("/models", "/documents")) for p in paths)
+
+    paths = _paths(main.create_app(Settings(APP_PROFILE="models", WARMUP_ON_STARTUP=False)))
+    assert "/models/ner" in paths
+    assert "/search" not in paths
+
+    paths = _paths(main.create_app(Settings(APP_PROFILE="all", WARMUP_ON_STARTUP=False)))
+    assert {"/search", "/models/ner", "/documents/upload"} <= paths
+
+def test_unknown_profile():
+    with pytest.raises(ValueError):
+        main.create_app(Settings(APP_PROFILE="nope"))
+
+def test_warmup_retries_and_degrades(monkeypatch):
+    calls = {"search": 0, "ingest": 0, "models": 0}
+    def warmer(name, fail_times):
+        def run():
+            calls[name] += 1
+            with warmup_mod.timed(name):
+                if calls[name] <= fail_times:
+                    raise RuntimeError(f"{name} down")
+        return run
+    monkeypatch.setattr(warmup_mod, "WARMERS", {
+        "search": warmer("search", 1),    # transient: recovers on retry
+        "ingest": warmer("ingest", 0),
+        "models": warmer("models", 99),   # e.g. spaCy model missing
+    })
+    sleeps = []
+    warmup_mod.reset_status("all")
+
+    warmup_mod.warmup("all", sleep=sleeps.append, attempts=3)
+
+    status = warmup_mod.status_snapshot()
+    assert status["ready"] is True
+    assert status["degraded"] == ["models"]
+    assert list(status["errors"]) == ["models"]
+    assert calls == {"search": 2, "ingest": 1, "models": 3}
+    assert sleeps == [1.0, 2.0]
+
+def test_status_snapshot_is_a_copy():
+    warmup_mod.reset_status("search")
+    with warmup_mod.timed("step"):
+        pass
+    status = warmup_mod.status_snapshot()
+    status["components"]["other"] = 1.0
+    assert list(warmup_mod.status_snapshot()["components"]) == ["step"]
@@ -27,3 +27,15 @@ def test_storage_roundtrip(tmp_path):
     assert len(texts) >= 1
     assert len(metas) >= 1
     assert metas[0]["doc_id"] == d.doc_id
+
+def test_export_blocks(tmp_path):
+    store = MetaStore(str(tmp_path / "meta.duckdb"))
+    store.insert_blocks("d2", [{"text": "b", "meta": {}}])
+    store.insert_blocks("d1", [{"text": f"t{i}", "meta": {}} for i in range(3)])
+
+    dest = tmp_path / "blocks.parquet"
+    rows = store.export_blocks(str(dest))
+
+    assert rows == 4
+    got = store.con.execute(f"SELECT doc_id, block_idx FROM read_parquet('{dest}')").fetchall()
+    assert got == [("d1", 0), ("d1", 1), ("d1", 2), ("d2", 0)]
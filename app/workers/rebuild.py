@@ -0,0 +1,274 @@
+# app/workers/rebuild.py
+"""
+Offline full-corpus rebuild: re-embeds every row of the DuckDB blocks table
+and builds a new FAISS index next to the live one, then swaps it in.
+
+    python -m app.workers.rebuild [--workers N] [--batch-size N] [--model NAME]
+
+- Snapshot: the blocks are exported to Parquet by the process that holds the
+  DuckDB connection (this CLI if the API is down, otherwise the API through
+  POST /documents/export), then the row count is checked.
+- Embeds chunk by chunk with a sentence-transformers multi-process pool.
+- Every chunk is a checkpoint (shard-NNNNN.npy/.pkl); re-running resumes
+  from the missing shards. --fresh starts over.
+- Swap: each build lives in INDEX_DIR.builds/<build_id> and INDEX_DIR is a
+  symlink to the active one, flipped with a single rename. The API keeps
+  serving the old index in memory and reloads when it sees the new BUILD file.
+- Catch-up: right before the swap, the docs ingested since the snapshot are
+  exported (every doc_id not in the earlier exports), embedded and appended
+  to the new build. If new docs keep arriving after CATCH_UP_ROUNDS, the swap
+  is refused. Ingests that land after the swap go to the new index (tasks.py).
+"""
+import argparse, json, logging, os, pickle, shutil, time, uuid
+import urllib.request
+from typing import List, Optional
+import numpy as np
+
+from ..core.config import get_settings
+from ..core.logging_conf import configure_logging
+from ..pipeline.embedder import start_pool, stop_pool, embed_texts, embed_texts_pool
+from ..pipeline.indexer import FaissIndex, BUILD_FILE, read_build
+from ..pipeline.storage import MetaStore
+
+log = logging.getLogger("rebuild")
+
+MANIFEST = "manifest.json"
+SNAPSHOT = "blocks.parquet"
+CATCH_UP_ROUNDS = 5
+
+def _shard_paths(work_dir: str, i: int):
+    base = os.path.join(work_dir, f"shard-{i:05d}")
+    return base + ".npy", base + ".pkl"
+
+def _parquet_rows(path: str) -> int:
+    import duckdb
+    con = duckdb.connect()
+    try:
+        return con.execute("SELECT COUNT(*) FROM read_parquet(?)", (path,)).fetchone()[0]
+    finally:
+        con.close()
+
+def export_snapshot(dest: str, db_path: str, api_url: str, exclude: Optional[List[str]] = None) -> int:
+    """
+    Exports the blocks to dest (Parquet), except the docs already in the
+    exclude exports. Output: rows, checked against the file.
+    """
+    import duckdb
+    try:
+        store = MetaStore(db_path, read_only=True)
+    except duckdb.IOException:
+        # The API holds the lock: its own connection takes the snapshot.
+        log.info(f"{db_path} is in use, exporting through {api_url}")
+        req = urllib.request.Request(
+            f"{api_url.rstrip('/')}/documents/export", method="POST",
+            data=json.dumps({"exclude": [os.path.abspath(p) for p in exclude or []]}).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(req) as resp:
+            res = json.load(resp)
+        shutil.move(res["path"], dest)
+        rows = res["rows"]
+    else:
+        try:
+            rows = store.export_blocks(dest, exclude=exclude)
+        finally:
+            store.close()
+
+    found = _parquet_rows(dest)
+    if found != rows:
+        raise SystemExit(f"Snapshot has {found} rows, expected {rows}")
+    return rows
+
+def _prepare(work_dir: str, db_path: str, model: str, batch_size: int, fresh: bool, api_url: str) -> dict:
+    """
+    Reuses work_dir if it belongs to the same model/batch_size, otherwise starts over.
+    The snapshot is taken once, so resumed shards always match the same rows.
+    """
+    manifest_path = os.path.join(work_dir, MANIFEST)
+    manifest = None
+    if not fresh and os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("model") != model or manifest.get("batch_size") != batch_size:
+            log.info("work dir belongs to another configuration, starting over")
+            manifest = None
+
+    if manifest is None:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        os.makedirs(work_dir)
+        rows = export_snapshot(os.path.join(work_dir, SNAPSHOT), db_path, api_url)
+        manifest = {"build_id": uuid.uuid4().hex, "model": model, "batch_size": batch_size, "rows": rows}
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+    return manifest
+
+def iter_snapshot(path: str, batch_size: int):
+    """
+    Streams (texts, metas) from the Parquet snapshot, same metas as fetch_block_metas.
+    """
+    import duckdb
+    con = duckdb.connect()
+    try:
+        con.execute(
+            "SELECT text, block_idx, doc_id FROM read_parquet(?) ORDER BY doc_id, block_idx",
+            (path,),
+        )
+        while True:
+            rows = con.fetchmany(batch_size)
+            if not rows:
+                break
+            yield [r[0] for r in rows], [{"text": r[0], "block_idx": r[1], "doc_id": r[2]} for r in rows]
+    finally:
+        con.close()
+
+def embed_shards(work_dir: str, model: str, batch_size: int, workers: int) -> int:
+    """
+    Writes one shard per chunk of blocks. Shards already on disk are skipped.
+    Output: number of rows.
+    """
+    pool = None
+    rows = 0
+    try:
+        for i, (texts, metas) in enumerate(iter_snapshot(os.path.join(work_dir, SNAPSHOT), batch_size)):
+            rows += len(texts)
+            vec_path, meta_path = _shard_paths(work_dir, i)
+            if os.path.exists(vec_path) and os.path.exists(meta_path):
+                continue
+            if pool is None:
+                log.info(f"embedding with {model} on {workers} workers")
+                pool = start_pool(model, workers)
+            t0 = time.time()
+            vecs = embed_texts_pool(texts, model, pool)
+
+            # tmp + rename: a killed run never leaves a half-written shard behind
+            with open(vec_path + ".tmp", "wb") as f:
+                np.save(f, vecs)
+            with open(meta_path + ".tmp", "wb") as f:
+                pickle.dump(metas, f)
+            os.replace(meta_path + ".tmp", meta_path)
+            os.replace(vec_path + ".tmp", vec_path)
+            log.info(f"shard {i}: {rows} blocks ({time.time() - t0:.1f}s)")
+    finally:
+        if pool is not None:
+            stop_pool(pool)
+    return rows
+
+def build_index(work_dir: str, manifest: dict, rows: int, builds_dir: str) -> str:
+    """
+    Assembles the shards into builds_dir/<build_id> (index.faiss + meta.pkl + BUILD).
+    """
+    if rows != manifest["rows"]:
+        raise SystemExit(f"Embedded {rows} rows, snapshot has {manifest['rows']}")
+    index_dir = os.path.join(builds_dir, manifest["build_id"])
+    shutil.rmtree(index_dir, ignore_errors=True)
+
+    index = None
+    i = 0
+    while True:
+        vec_path, meta_path = _shard_paths(work_dir, i)
+        if not os.path.exists(vec_path):
+            break
+        vecs = np.load(vec_path)
+        with open(meta_path, "rb") as f:
+            metas = pickle.load(f)
+        if index is None:
+            index = FaissIndex(dim=vecs.shape[1], index_dir=index_dir)
+        index.add(vecs, metas, persist=False)
+        i += 1
+
+    if index is None:
+        raise SystemExit("No blocks to index")
+    index.save()
+    with open(os.path.join(index_dir, BUILD_FILE), "w", encoding="utf-8") as f:
+        json.dump({"build_id": manifest["build_id"], "model": manifest["model"],
+                   "dim": index.dim, "rows": rows}, f)
+    return index_dir
+
+def catch_up(work_dir: str, new_dir: str, db_path: str, api_url: str, model: str, batch_size: int) -> int:
+    """
+    Appends to new_dir the docs ingested after the snapshot. Each round exports
+    the doc_ids missing from the snapshot and the previous rounds, until one
+    is empty. Output: rows added.
+    """
+    exports = [os.path.join(work_dir, SNAPSHOT)]
+    index = FaissIndex(dim=read_build(new_dir)["dim"], index_dir=new_dir)
+    added = 0
+    for i in range(CATCH_UP_ROUNDS):
+        delta = os.path.join(work_dir, f"delta-{i:03d}.parquet")
+        rows = export_snapshot(delta, db_path, api_url, exclude=exports)
+        exports.append(delta)
+        if rows == 0:
+            break
+        for texts, metas in iter_snapshot(delta, batch_size):
+            index.add(embed_texts(texts, model), metas, persist=False)
+        added += rows
+        log.info(f"catch-up round {i}: {rows} blocks ingested since the snapshot")
+    else:
+        raise SystemExit(f"Blocks still arriving after {CATCH_UP_ROUNDS} catch-up rounds: not swapping, re-run later")
+
+    if added:
+        index.save()
+        build = dict(index.build, rows=index.build["rows"] + added)
+        with open(os.path.join(new_dir, BUILD_FILE + ".tmp"), "w", encoding="utf-8") as f:
+            json.dump(build, f)
+        os.replace(os.path.join(new_dir, BUILD_FILE + ".tmp"), os.path.join(new_dir, BUILD_FILE))
+    return added
+
+def swap(new_dir: str, index_dir: str) -> None:
+    """
+    Points the index_dir symlink to new_dir with one rename of a temporary
+    symlink (atomic on POSIX). Keeps the new and the previous build (an API
+    that has not reloaded yet still writes to it) and removes older ones.
+    A plain index_dir (before the first rebuild) is moved into the builds dir
+    first: that one-time migration is the only step that is not atomic.
+    """
+    index_dir = index_dir.rstrip("/\\")
+    builds_dir = os.path.dirname(os.path.abspath(new_dir))
+    previous = None
+    if os.path.islink(index_dir):
+        previous = os.path.realpath(index_dir)
+    elif os.path.isdir(index_dir):
+        previous = os.path.join(builds_dir, f"legacy-{int(time.time())}")
+        os.replace(index_dir, previous)
+
+    # Relative target: works on the host and inside the container (./data is a volume).
+    target = os.path.relpath(os.path.abspath(new_dir), os.path.dirname(os.path.abspath(index_dir)))
+    tmp_link = f"{index_dir}.link-{uuid.uuid4().hex}"
+    os.symlink(target, tmp_link)
+    os.replace(tmp_link, index_dir)
+
+    keep = {os.path.realpath(new_dir), os.path.realpath(previous) if previous else None}
+    for name in os.listdir(builds_dir):
+        path = os.path.join(builds_dir, name)
+        if os.path.realpath(path) not in keep:
+            shutil.rmtree(path, ignore_errors=True)
+
+def main(argv=None) -> None:
+    settings = get_settings()
+    index_dir = settings.INDEX_DIR.rstrip("/\\")
+    parser = argparse.ArgumentParser(description="Re-embed all blocks and swap in a new FAISS index.")
+    parser.add_argument("--model", default=settings.EMBEDDING_MODEL)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-size", type=int, default=10000, help="blocks per checkpoint shard")
+    parser.add_argument("--work-dir", default=index_dir + ".rebuild", help="snapshot + shards")
+    parser.add_argument("--builds-dir", default=index_dir + ".builds", help="one directory per built index")
+    parser.add_argument("--api-url", default="http://localhost:8000", help="used for the snapshot if the API holds the DB")
+    parser.add_argument("--fresh", action="store_true", help="ignore previous checkpoints")
+    parser.add_argument("--no-swap", action="store_true", help="build only, leave the live index")
+    args = parser.parse_args(argv)
+
+    configure_logging(settings.LOG_LEVEL)
+    manifest = _prepare(args.work_dir, settings.DB_PATH, args.model, args.batch_size, args.fresh, args.api_url)
+    rows = embed_shards(args.work_dir, args.model, args.batch_size, args.workers)
+    new_dir = build_index(args.work_dir, manifest, rows, args.builds_dir)
+    if args.no_swap:
+        log.info(f"new index ready at {new_dir}")
+        return
+    added = catch_up(args.work_dir, new_dir, settings.DB_PATH, args.api_url, args.model, args.batch_size)
+    swap(new_dir, index_dir)
+    rows += added
+    shutil.rmtree(args.work_dir, ignore_errors=True)
+    log.info(f"swapped in build {manifest['build_id']} ({rows} blocks)")
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,88 @@
 # app/workers/tasks.py
 # app/workers/tasks.py
+import logging, os, threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List, Dict
+from typing import List, Dict, Optional
 from ..pipeline.parsers import parse
-from ..pipeline.embedder import embed_texts
-from ..pipeline.indexer import FaissIndex
+from ..pipeline.embedder import embed_texts, embedding_dim, get_model
+from ..pipeline.indexer import FaissIndex, StaleIndexError, build_key
 from ..pipeline.storage import MetaStore
 from ..core.config import get_settings
 
 settings = get_settings()
-store = MetaStore(settings.DB_PATH)
+log = logging.getLogger("tasks")
+
+# The DuckDB connection is opened on first use, not at import time.
+_store = None
+def get_store() -> MetaStore:
+    global _store
+    if _store is None:
+        _store = MetaStore(settings.DB_PATH)
+    return _store
 
 _index = None
-def get_index(dim: int = 384) -> FaissIndex:
-    global _index
-    if _index is None:
-        _index = FaissIndex(dim=dim, index_dir=settings.INDEX_DIR)
-    return _index
+_index_key = None
+_index_lock = threading.Lock()
+_reloading = None   # BUILD key being loaded in the background
+_failed_key = None  # BUILD key whose background load failed (not retried on every request)
+
+def _load_index(dim: Optional[int]) -> FaissIndex:
+    if dim is None and not os.path.exists(os.path.join(settings.INDEX_DIR, "index.faiss")):
+        dim = embedding_dim(settings.EMBEDDING_MODEL)
+    index = FaissIndex(dim=dim or 384, index_dir=settings.INDEX_DIR)
+    model = index_model(index)
+    get_model(model)  # loaded before the index is served, not by the first query
+    if model != settings.EMBEDDING_MODEL:
+        log.warning(
+            f"index build {index.build['build_id']} was embedded with {model}, "
+            f"EMBEDDING_MODEL is {settings.EMBEDDING_MODEL}: using {model} for this index"
+        )
+    return index
+
+def _reload(key: tuple) -> None:
+    global _index, _index_key, _reloading, _failed_key
+    try:
+        index = _load_index(None)
+    except Exception:
+        log.exception("loading the swapped-in index failed, still serving the old one")
+        index = None
+    with _index_lock:
+        if index is not None:
+            # A wait=True caller may have loaded (and written to) this build already.
+            if _index_key != key:
+                _index, _index_key = index, key
+        else:
+            _failed_key = key
+        _reloading = None
+
+def get_index(dim: Optional[int] = None, wait: bool = False) -> FaissIndex:
+    """
+    Notices when an offline rebuild swapped a new index in (BUILD changed).
+    The hot path is one stat of BUILD. The new index (and its model) is loaded
+    in a background thread; until it is ready the old index keeps serving.
+    wait=True loads it now instead (ingest after a StaleIndexError).
+    dim is only used when there is no index on disk yet (default: dim of the model).
+    """
+    global _index, _index_key, _reloading
+    key = build_key(settings.INDEX_DIR)
+    index = _index
+    if index is not None and (key is None or key == _index_key):
+        return index
+
+    with _index_lock:
+        if _index is None or (wait and key is not None and key != _index_key):
+            _index, _index_key = _load_index(dim), key
+        elif key is not None and key != _index_key and _reloading is None and key != _failed_key:
+            _reloading = key
+            threading.Thread(target=_reload, args=(key,), daemon=True).start()
+        return _index
+
+def index_model(index: FaissIndex) -> str:
+    """
+    Embedding model the vectors of this index come from: queries and new
+    blocks must be embedded with it, not just with EMBEDDING_MODEL.
+    """
+    return index.build["model"] if index.build else settings.EMBEDDING_MODEL
 
 executor = ThreadPoolExecutor(max_workers=4)
 
@@ -33,6 +99,7 @@ def ingest_paths(paths: List[str]) -> Dict:
         ok, payload = f.result()
         (docs if ok else errors).append(payload)
 
+    store = get_store()
     all_texts, all_metas = [], []
     for d in docs:
         store.upsert_document({"doc_id": d.doc_id, "path": d.source_path, "mime": d.mime_type, "title": d.title})
@@ -48,8 +115,18 @@ def ingest_paths(paths: List[str]) -> Dict:
             "errors": [{"path": p, "error": str(e)} for p, e in errors]
         }
 
-    vecs = embed_texts(all_texts, settings.EMBEDDING_MODEL)
-    get_index(dim=vecs.shape[1]).add(vecs, all_metas)
+    index = get_index()
+    try:
+        index.add(embed_texts(all_texts, index_model(index)), all_metas)
+    except StaleIndexError:
+        # An offline rebuild swapped the index in the meantime: add to the new
+        # one (with its model), skipping docs its catch-up already indexed.
+        index = get_index(wait=True)
+        known = {m["doc_id"] for m in index.meta}
+        pending = [(t, m) for t, m in zip(all_texts, all_metas) if m["doc_id"] not in known]
+        if pending:
+            texts, metas = [p[0] for p in pending], [p[1] for p in pending]
+            index.add(embed_texts(texts, index_model(index)), metas)
 
     return {
         "ingested_docs": len(docs),
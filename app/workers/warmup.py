@@ -0,0 +1,151 @@
+# app/workers/warmup.py
+"""
+Startup reporting + explicit warmup per app profile.
+
+STATUS is what /ready returns:
+- ready: True once the critical warmers of the profile succeeded (or when warmup is disabled)
+- degraded: non-critical warmers still failing (the replica serves, those routes may fail)
+- components: seconds spent per component (router imports + warmup steps)
+- errors: component -> message, for the components still failing
+Failed warmers are retried in the background with exponential backoff.
+The warmup thread writes STATUS while /ready reads it: both go through
+_status_lock (update_status / status_snapshot).
+"""
+import copy, importlib, logging, threading, time
+from contextlib import contextmanager
+from typing import Callable, Dict, Any, Optional
+
+log = logging.getLogger("startup")
+
+# Routers served by each profile
+PROFILES = {
+    "all": ["documents", "search", "models"],
+    "search": ["search"],
+    "ingest": ["documents"],
+    "models": ["models"],
+}
+
+# Warmers that must succeed before /ready is 200. The rest only degrade the replica
+# (e.g. a missing spaCy model must not take search down in the "all" profile).
+CRITICAL = {
+    "all": ["search", "ingest"],
+    "search": ["search"],
+    "ingest": ["ingest", "search"],
+    "models": ["models"],
+}
+
+MAX_BACKOFF = 60.0  # seconds between retries, at most
+
+STATUS: Dict[str, Any] = {"ready": False, "profile": None, "degraded": [], "components": {}, "errors": {}}
+_status_lock = threading.Lock()
+
+def reset_status(profile: str) -> None:
+    update_status(ready=False, profile=profile, degraded=[], components={}, errors={})
+
+def update_status(**fields) -> None:
+    with _status_lock:
+        STATUS.update(fields)
+
+def status_snapshot() -> Dict[str, Any]:
+    """
+    Deep copy of STATUS taken under the lock (safe to serialize while warmup runs).
+    """
+    with _status_lock:
+        return copy.deepcopy(STATUS)
+
+@contextmanager
+def timed(component: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+        with _status_lock:
+            STATUS["errors"].pop(component, None)
+    except Exception as e:
+        with _status_lock:
+            STATUS["errors"][component] = str(e)
+        raise
+    finally:
+        secs = round(time.perf_counter() - t0, 3)
+        with _status_lock:
+            STATUS["components"][component] = secs
+        log.info(f"{component} took {secs}s")
+
+def _warm_search():
+    from ..pipeline.embedder import get_model, embed_texts
+    from .tasks import get_index, index_model
+
+    with timed("faiss_index"):
+        index = get_index()
+    with timed("embedding_model"):
+        # the model of the index on disk (it may come from a rebuild with another model)
+        model = index_model(index)
+        get_model(model)
+    with timed("dummy_query"):
+        index.search(embed_texts(["warmup"], model), k=1)
+
+def _warm_ingest():
+    from .tasks import get_store
+    with timed("duckdb"):
+        get_store()
+    with timed("parsers"):
+        importlib.import_module("pdfplumber")
+        importlib.import_module("docx")
+
+def _warm_models():
+    from ..pipeline.ner import get_nlp
+    from ..pipeline import classifier
+    with timed("spacy"):
+        get_nlp()
+    with timed("classifier"):
+        try:
+            classifier.load_current()
+        except FileNotFoundError:
+            importlib.import_module("sklearn.linear_model")  # not trained yet
+
+WARMERS: Dict[str, Callable[[], None]] = {
+    "search": _warm_search,
+    "ingest": _warm_ingest,
+    "models": _warm_models,
+}
+
+# Warmers needed by each router (ingest embeds and indexes what it parses)
+ROUTER_WARMERS = {
+    "search": ["search"],
+    "documents": ["ingest", "search"],
+    "models": ["models"],
+}
+
+def warmup(profile: str, sleep: Callable[[float], None] = time.sleep, attempts: Optional[int] = None) -> None:
+    """
+    Runs each warmer of the profile once (search is shared by documents and search),
+    then retries the failed ones with backoff (forever by default, attempts caps it).
+    A failing step stops its warmer.
+    """
+    pending = []
+    for r in PROFILES[profile]:
+        for name in ROUTER_WARMERS[r]:
+            if name not in pending:
+                pending.append(name)
+    critical = set(CRITICAL[profile])
+
+    delay, attempt = 1.0, 0
+    while True:
+        attempt += 1
+        failed = []
+        for name in pending:
+            try:
+                WARMERS[name]()
+            except Exception:
+                log.exception(f"warmup of {name} failed (attempt {attempt})")
+                failed.append(name)
+        # A warmer that succeeded is never retried, so only the failed ones matter here.
+        ready = not critical.intersection(failed)
+        degraded = [n for n in failed if n not in critical]
+        update_status(ready=ready, degraded=degraded)
+        if not failed or (attempts is not None and attempt >= attempts):
+            break
+        log.warning(f"retrying warmup of {failed} in {delay}s")
+        sleep(delay)
+        delay = min(delay * 2, MAX_BACKOFF)
+        pending = failed
+    log.info(f"warmup finished, ready={ready}, degraded={degraded}")